@@ -13,6 +13,7 @@ from pycircuit.post.result import IVResultDict
 from pycircuit.post.internalresult import InternalResultDict
 from copy import copy
 import numeric
+import numpy as np
 import types
 
 class NoConvergenceError(Exception):
@@ -48,7 +49,7 @@ class CircuitResult(IVResultDict, InternalResultDict):
     def v(self, plus, minus=None):
         result = self.circuit.extract_v(self.x, plus, minus)
 
-        if minus != None:
+        if minus is not None:
             ylabel = 'v(%s,%s)'%(str(plus), str(minus))
         else:
             ylabel = 'v(%s)'%(str(plus))
@@ -61,11 +62,18 @@ class CircuitResult(IVResultDict, InternalResultDict):
         return self.build_waveform(result, 'i(%s)'%(str(term)), 'A')
 
 def remove_row_col(matrices, n, toolkit):
+    """Remove row and column n from the given vectors and matrices
+
+    The rows and columns to keep are selected with an index array so each
+    matrix is copied once instead of once per axis.
+    """
     result = []
+    keep = {}
     for A in matrices:
-        for axis in range(len(A.shape)):
-            A=toolkit.delete(A, [n], axis=axis)
-        result.append(A)
+        size = A.shape[0]
+        if size not in keep:
+            keep[size] = np.delete(np.arange(size), n)
+        result.append(A[np.ix_(*(keep[size],) * len(A.shape))])
     return tuple(result)
 
 class Analysis(sim.Analysis):
@@ -79,8 +87,8 @@ class Analysis(sim.Analysis):
         self.parameters = super(Analysis, self).parameters + self.parameters
         super(Analysis, self).__init__(cir, **kvargs)
 
-        if toolkit == None:
-            if cir.toolkit == None:
+        if toolkit is None:
+            if cir.toolkit is None:
                 toolkit = numeric
             else:
                 toolkit = cir.toolkit
@@ -97,7 +105,8 @@ class Analysis(sim.Analysis):
         self.epar = epar
 
 def fsolve(f, x0, args=(), full_output=False, maxiter=200,
-           xtol=1e-6, reltol=1e-4, abstol=1e-12, toolkit='Numeric'):
+           xtol=1e-6, reltol=1e-4, abstol=1e-12, toolkit='Numeric',
+           lureuse=None, precond=None):
     """Solve a multidimensional non-linear equation with Newton-Raphson's method
 
     In each iteration the linear system
@@ -105,22 +114,47 @@ def fsolve(f, x0, args=(), full_output=False, maxiter=200,
     M{J(x_n)(x_{n+1}-x_n) + F(xn) = 0
 
     is solved and a new value for x is obtained x_{n+1}
+
+    The iteration stops when the step is within reltol of the magnitude of
+    x_n or x_{n+1} plus xtol, or when the residual is within reltol of
+    its largest magnitude plus abstol.
+
+    The sparsity pattern of the Jacobian is the same in all iterations so
+    only the first LU factorization computes a column ordering, the 
+    following ones reuse it. The ordering of a factorization from an earlier
+    call can be given by *lureuse* and the last factorization is returned in
+    the infodict under the key 'lu' and the number of iterations under 
+    the key 'niter'.
+
+    If *precond* is given the Jacobian is not factored, instead the linear
+    systems are solved by toolkit.krylov_solve preconditioned by the 
+    factorization precond to a relative residual of reltol. As these steps
+    are inexact only the residual test is used for convergence.
     
     """
     
     converged = False
     ier = 2
+    lu = lureuse
     for i in xrange(maxiter):
         F, J = f(x0, *args) # TODO: Make sure J is never 0, e.g. by gmin (stepping)
-        xdiff = toolkit.linearsolver(J, -F)# TODO: Limit xdiff to improve convergence
+        if precond is None:
+            lu = toolkit.lu_factor(J, reuse=lu)
+            xdiff = lu.solve(-F)# TODO: Limit xdiff to improve convergence
+        else:
+            xdiff = toolkit.krylov_solve(J, -F, precond, tol=reltol)
 
         x = x0 + xdiff
 
-        if toolkit.alltrue(abs(xdiff) < reltol * toolkit.maximum(x, x0) + xtol):
+        if precond is None and \
+                toolkit.alltrue(abs(xdiff) < 
+                                reltol * toolkit.maximum(abs(x), abs(x0)) + 
+                                xtol):
             ier = 1
             mesg = "Success"
             break
-        if toolkit.alltrue(abs(F) < reltol * max(F) + abstol):
+        absF = abs(F)
+        if toolkit.alltrue(absF < reltol * absF.max() + abstol):
             ier = 1
             mesg = "Success"
             break
@@ -130,7 +164,7 @@ def fsolve(f, x0, args=(), full_output=False, maxiter=200,
     if ier == 2:
         mesg = "No convergence. xerror = "+str(xdiff)
     
-    infodict = {}
+    infodict = {'lu': lu, 'niter': i + 1}
     if full_output:
         return x, infodict, ier, mesg
     else:
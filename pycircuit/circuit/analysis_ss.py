@@ -14,6 +14,7 @@ from pycircuit.post.internalresult import InternalResultDict
 from pycircuit.circuit.dcanalysis import DC
 
 import numeric
+import numpy as np
 import types
 
 
@@ -57,7 +58,18 @@ class SSAnalysis(Analysis):
             return self.toolkit.concatenate((x[:irefnode], self.toolkit.array([0.0]), x[irefnode:]))
             
         if isiterable(ss):
-            return self.toolkit.array([myfunc(s) for s in ss]).swapaxes(0,1)
+            ## Write the solutions as columns of an (n, nfreq) array so the 
+            ## rows for each node are contiguous and no transpose is needed.
+            ## The reference node row is left at zero.
+            keep = np.delete(np.arange(self.cir.n), irefnode)
+            xall = None
+            for k, s in enumerate(ss):
+                x = func(s)
+                if xall is None:
+                    xall = self.toolkit.zeros((self.cir.n, len(ss)), 
+                                              dtype=x.dtype)
+                xall[keep, k] = x
+            return xall
         else:
             return myfunc(ss)
 
@@ -110,7 +122,21 @@ class AC(SSAnalysis):
         self.parameters = super(AC, self).parameters + self.parameters            
         super(AC, self).__init__(cir, **kvargs)
 
-    def solve(self, freqs, refnode=gnd, complexfreq = False, u = None):
+        ## Last LU factorization, its column ordering is reused since the 
+        ## sparsity pattern of s*C + G is the same for all frequencies
+        self._lu = None
+
+    def solve(self, freqs, refnode=gnd, complexfreq = False, u = None,
+              low_precision = False):
+        """Solve the circuit at the given frequencies
+
+        If *low_precision* is True the numeric toolkit solves the circuit 
+        equations in single precision which halves the memory traffic of the
+        solves. The result is still stored in double precision but is only
+        single precision accurate, so it should only be used for 
+        well-conditioned circuits.
+
+        """
         G, C, CY, u, x, ss = self.dc_steady_state(freqs, refnode,
                                               complexfreq = complexfreq, u = u)
 
@@ -119,10 +145,36 @@ class AC(SSAnalysis):
         irefnode = self.cir.get_node_index(refnode)
         G,C,CY,u = remove_row_col((G,C,CY,u), irefnode, self.toolkit)
 
-        def acsolve(s):
-            return self.toolkit.linearsolver(s*C + G, -u)
+        low_precision = low_precision and not self.toolkit.symbolic
+        if low_precision:
+            G, C, u = (A.astype(np.complex64) for A in (G, C, u))
+            if isiterable(ss):
+                ssolve = np.asarray(ss, dtype=np.complex64)
+            else:
+                ssolve = np.complex64(ss)
+        else:
+            ssolve = ss
+
+        if isiterable(ss) and not self.toolkit.symbolic and \
+                np.size(u) <= self.toolkit.batch_solve_max_size:
+            ## Solve the frequency sweep with batched calls
+            ss = np.asarray(ss)
+            ssolve = np.asarray(ssolve)
+            xbatch = self.toolkit.linearsolver_sweep(G, C, ssolve, -u)
+
+            # Insert reference node voltage, the result is stored as 
+            # (n, nfreq) with contiguous rows for each node
+            xac = np.zeros((self.cir.n, len(ss)), dtype=xbatch.dtype)
+            xac[np.arange(self.cir.n) != irefnode] = xbatch.T
+        else:
+            def acsolve(s):
+                self._lu = self.toolkit.lu_factor(s*C + G, reuse=self._lu)
+                return self._lu.solve(-u)
+
+            xac = self.ss_map_function(acsolve, ssolve, refnode)
 
-        xac = self.ss_map_function(acsolve, ss, refnode)
+        if low_precision:
+            xac = xac.astype(complex)
 
         self.result = CircuitResultAC(self.cir, x, xac, ss * xac, 
                                       sweep_values = freqs, 
@@ -185,25 +237,53 @@ class TransimpedanceAnalysis(SSAnalysis):
 
         Yreciprocal = self.toolkit.toMatrix(Yreciprocal)
 
-        result = []
-        for branch in outbranches:
-            ## Stimuli
+        ## Map nodes and branches to x-vector rows once instead of scanning
+        ## the node and branch lists for every output branch
+        nnodes = len(self.cir.nodes)
+        node_index, branch_index = {}, {}
+        for i, node in enumerate(self.cir.nodes):
+            node_index.setdefault(node, i)
+        for i, cirbranch in enumerate(self.cir.branches):
+            branch_index.setdefault(cirbranch, nnodes + i)
+
+        ## Nodes and branches that are not found are passed on to the 
+        ## circuit which converts node names and raises a ValueError
+        def get_node_index(node):
+            if node in node_index:
+                return node_index[node]
+            return self.cir.get_node_index(node)
+
+        def get_branch_index(branch):
+            if branch in branch_index:
+                return branch_index[branch]
+            return self.cir.get_branch_index(branch)
+
+        if len(outbranches) == 0:
+            return []
+
+        ## Yreciprocal is the same for all output branches so it is only 
+        ## factored once
+        lu = self.toolkit.lu_factor(Yreciprocal)
+
+        ## The stimuli of all output branches are written as columns of one
+        ## matrix with the reference node row removed. The matrix has the 
+        ## type of Yreciprocal so it is not converted by the solver.
+        U = self.toolkit.zeros((n - 1, len(outbranches)), dtype=complex)
+        for k, branch in enumerate(outbranches):
             if currentoutput:
-                u = zeros(n, dtype=int)
-                ibranch = self.cir.get_branch_index(branch)
-                u[ibranch] = -1
+                stimuli = ((get_branch_index(branch), -1),)
             else:
-                u = self.toolkit.zeros(n, dtype=int)
                 ## The signed is swapped because the u-vector appears in the lhs
-                u[self.cir.get_node_index(branch.plus)] = -1
-                u[self.cir.get_node_index(branch.minus)] = 1
-
-            u, = remove_row_col((u,), irefnode, self.toolkit)
+                stimuli = ((get_node_index(branch.plus), -1), 
+                           (get_node_index(branch.minus), 1))
 
-            ## Calculate transimpedances from currents in each nodes to output
-            result.append(self.toolkit.linearsolver(Yreciprocal, -u))
+            for i, value in stimuli:
+                if i != irefnode:
+                    U[i - (i > irefnode), k] = value
 
-        return result
+        ## Calculate transimpedances from currents in each nodes to output
+        ## with one back substitution for all output branches
+        return list(lu.solve(-U).T)
 
 
 class Noise(SSAnalysis):
@@ -286,14 +366,14 @@ class Noise(SSAnalysis):
         super(Noise, self).__init__(cir, **kvargs)
 
     
-        if not (self.par.outputnodes != None or self.par.outputsrc != None):
+        if not (self.par.outputnodes is not None or self.par.outputsrc is not None):
             raise ValueError('Output is not specified')
-        elif self.par.outputnodes != None and self.par.outputsrc != None:
+        elif self.par.outputnodes is not None and self.par.outputsrc is not None:
             raise ValueError('Cannot measure both output current and voltage '
                              'noise')
         
         if not (type(self.par.inputsrc) is types.StringType and \
-                self.par.outputsrc == None or \
+                self.par.outputsrc is None or \
                     type(self.par.outputsrc) is types.StringType):
             raise ValueError('Sources must be given as instance names')
 
@@ -304,10 +384,11 @@ class Noise(SSAnalysis):
         if self.outputsrc_name:
             self.outputsrc = self.cir[self.par.outputsrc]
 
+        ## Last LU factorization of the reciprocal admittance matrix
+        self._lu = None
+
     def noise_map_function(self, func, ss, refnode):
         """Apply a function over a list of frequencies or a single frequency"""
-        irefnode = self.cir.nodes.index(refnode)
-
         def myfunc(s):
             x, g = func(s)
             return x,g 
@@ -329,19 +410,11 @@ class Noise(SSAnalysis):
 
         tk = self.toolkit
         
-        def noisesolve(s):
-
-            # Calculate the reciprocal G and C matrices
-            Yreciprocal = G.T + s*C.T
-            
-            Yreciprocal2, uu = (tk.toMatrix(A) for A in (Yreciprocal, u))
-            
-            ## Calculate transimpedances from currents in each nodes to output
-            zm =  tk.linearsolver(Yreciprocal2, -uu)
+        def extract_gain(zm):
+            """Extract gain from the transimpedances in zm
 
-            xn2out = tk.dot(tk.dot(zm.reshape(1, tk.size(zm)), CY), tk.conj(zm))
-
-            ## Etract gain
+            zm is either a vector or has one row for each node and branch
+            """
             gain = None
             if isinstance(self.inputsrc, VS):
                 gain = self.cir.extract_i(zm, 
@@ -356,10 +429,24 @@ class Noise(SSAnalysis):
                                           self.cir.get_node(plus_node), 
                                           self.cir.get_node(minus_node), 
                                           refnode=refnode, refnode_removed=True)
-            return xn2out[0], gain
+            return gain
+
+        def noisesolve(s):
+
+            # Calculate the reciprocal G and C matrices
+            Yreciprocal = G.T + s*C.T
+            
+            ## Calculate transimpedances from currents in each nodes to output,
+            ## the gain below is extracted from the same solution
+            self._lu = tk.lu_factor(Yreciprocal, reuse=self._lu)
+            zm = self._lu.solve(-u)
+
+            xn2out = tk.dot(zm, tk.dot(CY, tk.conj(zm)))
+
+            return xn2out, extract_gain(zm)
 
         # Calculate output voltage noise
-        if self.outputnodes != None:
+        if self.outputnodes is not None:
             ioutp, ioutn = (self.cir.get_node_index(node) 
                             for node in self.outputnodes)
             u[ioutp] = -1
@@ -373,17 +460,27 @@ class Noise(SSAnalysis):
             
         ## Refer the voltages to the gnd node by removing
         ## the rows and columns that corresponds to this node
-        irefnode = self.cir.nodes.index(refnode)
+        irefnode = self.cir.get_node_index(refnode)
         G,C,CY,u = remove_row_col((G,C,CY,u), irefnode, tk)
         
-        xn2out, gain = self.noise_map_function(noisesolve, ss, refnode)
+        if isiterable(ss) and not tk.symbolic and \
+                np.size(u) <= tk.batch_solve_max_size:
+            ## Solve the reciprocal systems of the whole frequency sweep at 
+            ## once, CY is the same at all frequencies so the output noise
+            ## of the sweep is calculated with one matrix product
+            ss = np.asarray(ss)
+            zm = tk.linearsolver_sweep(G.T, C.T, ss, -u)
+            xn2out = (tk.dot(zm, CY) * tk.conj(zm)).sum(axis=1)
+            gain = extract_gain(zm.T)
+        else:
+            xn2out, gain = self.noise_map_function(noisesolve, ss, refnode)
 
         # Store results
         result = InternalResultDict()
 
-        if self.outputnodes != None:
+        if self.outputnodes is not None:
             result['Svnout'] = xn2out
-        elif self.outputsrc != None:
+        elif self.outputsrc is not None:
             result['Sinout'] = xn2out
 
         # Calculate the gain from the input voltage source by using the 
@@ -426,7 +523,7 @@ def dc_steady_state(cir, freqs, refnode, toolkit, complexfreq = False,
     CY = cir.CY(x, toolkit.imag(ss), epar)
 
     ## Allow for custom stimuli, mainly used by other analyses
-    if u == None:
+    if u is None:
         u = cir.u(x, analysis=analysis, epar=epar)
 
     return G, C, CY, u, x, ss
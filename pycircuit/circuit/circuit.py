@@ -308,7 +308,7 @@ class Circuit(object):
 
         if node in self.nodes:
             index = self.nodes.index(node)
-            if refnode != None:
+            if refnode is not None:
                 irefnode = self.nodes.index(refnode)
                 if index == irefnode:
                     return None
@@ -419,7 +419,7 @@ class Circuit(object):
                [ 1.   ,  0.   , -1.   ,  0.   ]])
         """
         
-        if self.get_terminal_branch(terminal) == None:
+        if self.get_terminal_branch(terminal) is None:
             return ProbeWrapper(self, terminals = (terminal,))
         else:
             return self            
@@ -440,7 +440,7 @@ class Circuit(object):
         will have a instancename<dot> prefix added to the node name
 
         """
-        if instancename == None:
+        if instancename is None:
             return self.nodes[self._nterminalnodes:]
         else:
             result = []
@@ -519,13 +519,19 @@ class Circuit(object):
         >>> 
 
         """
-        result = {}
-        for xvalue, node in zip(x[:len(self.nodes)][0], self.nodes):
-            result[self.get_node_name(node)] = xvalue
-
+        x = np.ravel(x)
         nnodes = len(self.nodes)
-        for i, xvalue, branch in enumerate(zip(x[nnodes:], self.branches)):
-            result['i' + analysis + str(i) + ')'] = xvalue            
+
+        ## Invert the local node name map once instead of searching it for
+        ## every node, only nodes of sub-elements need get_node_name
+        localnames = dict((node, name) for name, node in self.nodenames.items())
+        nodenames = [localnames.get(node) or self.get_node_name(node)
+                     for node in self.nodes]
+
+        result = dict(zip(nodenames, x[:nnodes]))
+        result.update(('i' + analysis + str(i) + ')', xvalue) 
+                      for i, xvalue in enumerate(x[nnodes:nnodes + 
+                                                   len(self.branches)]))
 
         return result
 
@@ -590,7 +596,7 @@ class Circuit(object):
         for node in nodep, noden:
             if type(node) is types.StringType:
                 node = self.get_node(node)
-            elif node == None:
+            elif node is None:
                 node = refnode
 
             if refnode_removed:
@@ -598,7 +604,7 @@ class Circuit(object):
             else:
                 nodeindex = self.get_node_index(node, None)
 
-            if nodeindex == None: ## When node == refnode
+            if nodeindex is None: ## When node == refnode
                 v.append(0)
                 continue
                     
@@ -673,14 +679,14 @@ class Circuit(object):
 
             branch_sign = self.get_terminal_branch(branch_or_term)
 
-            if branch_sign != None:
+            if branch_sign is not None:
                 branch, sign = branch_sign
             else:
                 terminal_node = self.nodenames[branch_or_term]
                 
                 terminal_node_index = self.get_node_index(terminal_node)
 
-                if xdot != None:
+                if xdot is not None:
                     if linearized:
                         return dot(self.G(xdcop)[terminal_node_index], x) + \
                             dot(self.C(xdcop)[terminal_node_index], xdot) + \
@@ -744,7 +750,7 @@ class Circuit(object):
                            instancebranches = None):
         """Return circuit branches from instance branches
         """
-        if instancebranches == None:
+        if instancebranches is None:
             instancebranches = instance.branches
 
         for instancebranch in instancebranches:
@@ -1041,18 +1047,18 @@ class SubCircuit(Circuit):
         """
 
         ## Use name of node object if present
-        if node.name != None:
+        if node.name is not None:
             return node.name
         
         ## First search among the local nodes
         name = Circuit.get_node_name(self, node)
-        if name != None:
+        if name is not None:
             return name
         
         ## Then search in the circuit elements
         for instname, element in self.elements.items():
             name =  element.get_node_name(node)
-            if name != None:
+            if name is not None:
                 return instname + '.' + name
         
     def update_node_map(self):
@@ -1156,7 +1162,7 @@ class SubCircuit(Circuit):
                   refnode = gnd, refnode_removed = False, 
                   linearized = False, xdcop = None):
         if type(branch_or_term) is types.StringType:
-            if self.get_terminal_branch(branch_or_term) == None:
+            if self.get_terminal_branch(branch_or_term) is None:
 
                 hierlevels = [part for part in branch_or_term.split('.')]
 
@@ -1170,7 +1176,7 @@ class SubCircuit(Circuit):
 
                     subx = x[nodemap]
 
-                    if xdot != None:
+                    if xdot is not None:
                         subxdot = xdot[nodemap]
                     else:
                         subxdot = None
@@ -1201,7 +1207,7 @@ class SubCircuit(Circuit):
         for instance, element in self.elements.items():
             nodemap = self.elementnodemap[instance]
 
-            if x != None:
+            if x is not None:
                 subx = x[nodemap]
                 try:
                     rhs = getattr(element, methodname)(subx, *args)
@@ -1222,7 +1228,7 @@ class SubCircuit(Circuit):
         lhs = self.toolkit.zeros(n, dtype=dtype)
 
         for instance, element in self.elements.items():
-            if x != None:
+            if x is not None:
                 subx = x[self.elementnodemap[instance]]
                 rhs = getattr(element, methodname)(subx, *args)
             else:
@@ -1280,7 +1286,7 @@ class ProbeWrapper(SubCircuit):
         """Returns a circuit where the given terminal current is saved"""
         
         ## Add probe to terminal if it does not already exists
-        if self.get_terminal_branch(terminal) == None:
+        if self.get_terminal_branch(terminal) is None:
             node = self.get_node(terminal)
             ## Add internal node
             internal_node = self.add_node(terminal + '_internal')
@@ -1311,7 +1317,7 @@ class CircuitProxy(Circuit):
         
         ## Find out how this instance was connected to its parent
         ## and set terminalhook accordingly
-        if isinstance(parent, SubCircuit) and instance_name != None:
+        if isinstance(parent, SubCircuit) and instance_name is not None:
             self.terminalhook = parent.term_node_map[instance_name]
 
     def G(self, x, epar=defaultepar): return self.device.G(x,epar)
@@ -0,0 +1,182 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2008 Pycircuit Development Team
+# See LICENSE for details.
+
+"""Code generation of linear solvers specialized for a sparsity pattern
+
+The sparsity pattern of the MNA matrices is fixed during a simulation, only
+the values change. Given the pattern and a pivot order the LU factorization
+and the forward and backward substitutions can be written out as
+straight-line code where only the non-zero entries and the fill-in are
+touched. There is no pivot search and no index arithmetic left in the
+generated function.
+
+>>> pattern = [(0, 0), (0, 1), (1, 0)]
+>>> solver = compile_lu_solver(pattern, [1, 0], [0, 1])
+>>> x = np.zeros(2)
+>>> solver(np.array([[1., 2.], [3., 0.]]), np.array([5., 3.]), np.zeros(2), x)
+True
+>>> x
+array([ 1.,  2.])
+
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+## Most recently used solvers, at most max_cached_solvers are kept
+_solvers = OrderedDict()
+max_cached_solvers = 16
+
+def _lu_lines(pattern, rowperm, colperm, load, tol, out):
+    """Return the statements of the LU factorization and solve
+    
+    *load*, *tol* and *out* are format strings of the expressions of entry
+    (i, j) of A, the tolerance of pivot k and element j of the solution.
+    
+    """
+    n = len(rowperm)
+    invrow = np.argsort(rowperm)
+    invcol = np.argsort(colperm)
+
+    ## Non-zero entries of the permuted matrix indexed by row and column
+    rows = [set() for k in range(n)]
+    cols = [set() for k in range(n)]
+
+    lines = []
+
+    for i, j in pattern:
+        p, q = invrow[i], invcol[j]
+        rows[p].add(q)
+        cols[q].add(p)
+        lines.append('a%d_%d = '%(p, q) + load%{'i': i, 'j': j})
+
+    ## LU factorization, L is stored below the diagonal with an implicit
+    ## unit diagonal
+    for k in range(n):
+        if k not in rows[k]:
+            raise ValueError('Pivot %d is structurally zero'%k)
+
+        lines.append('if not abs(a%d_%d) > %s: return False'%
+                     (k, k, tol%{'k': k}))
+
+        below = sorted(i for i in cols[k] if i > k)
+        right = sorted(j for j in rows[k] if j > k)
+
+        for i in below:
+            lines.append('a%d_%d = a%d_%d / a%d_%d'%(i, k, i, k, k, k))
+            for j in right:
+                if j in rows[i]:
+                    lines.append('a%d_%d = a%d_%d - a%d_%d * a%d_%d'%
+                                 (i, j, i, j, i, k, k, j))
+                else:
+                    ## Fill-in
+                    rows[i].add(j)
+                    cols[j].add(i)
+                    lines.append('a%d_%d = -a%d_%d * a%d_%d'%
+                                 (i, j, i, k, k, j))
+
+    ## Forward substitution L y = P b
+    for p in range(n):
+        terms = ''.join(' - a%d_%d * y%d'%(p, q, q)
+                        for q in sorted(rows[p]) if q < p)
+        lines.append('y%d = b[%d]%s'%(p, rowperm[p], terms))
+
+    ## Backward substitution U z = y, x = Q z
+    for p in reversed(range(n)):
+        terms = ''.join(' - a%d_%d * y%d'%(p, q, q)
+                        for q in sorted(rows[p]) if q > p)
+        lines.append('y%d = (y%d%s) / a%d_%d'%(p, p, terms, p, p))
+        lines.append(out%{'j': colperm[p]} + ' = y%d'%p)
+
+    return lines
+
+def generate_lu_source(pattern, rowperm, colperm, name='lu_solve'):
+    """Return python source of a function that solves A x = b
+
+    *pattern*
+      Sequence of (row, column) tuples of the non-zero entries of A
+
+    *rowperm*, *colperm*
+      Row k of the permuted matrix is row rowperm[k] of A and column k is
+      column colperm[k] of A. The permuted matrix is factored without
+      pivoting.
+
+    The generated function has the signature f(A, b, tol, x) and writes the
+    solution to x. It returns False if the magnitude of pivot k is not
+    above tol[k]. A ValueError is raised if a pivot is structurally zero.
+
+    """
+    lines = ['def %s(A, b, tol, x):'%name]
+    lines += ['    ' + line for line in 
+              _lu_lines(pattern, rowperm, colperm, 
+                        'A[%(i)d, %(j)d]', 'tol[%(k)d]', 'x[%(j)d]')]
+    lines.append('    return True')
+
+    return '\n'.join(lines) + '\n'
+
+def generate_sweep_source(pattern, rowperm, colperm, name='lu_sweep'):
+    """Return python source of a function that solves (s C + G) x = b 
+    for a sequence of s
+
+    *pattern* is the union of the non-zero entries of G and C, the other
+    arguments are the same as for generate_lu_source.
+
+    The generated function has the signature f(G, C, ss, b, tol, X) and 
+    writes the solution for ss[k] to X[k]. It returns False if the
+    magnitude of pivot p is not above tol[k, p] for any ss[k].
+
+    """
+    lines = ['def %s(G, C, ss, b, tol, X):'%name,
+             '    for k in range(len(ss)):',
+             '        s = ss[k]']
+    lines += ['        ' + line for line in 
+              _lu_lines(pattern, rowperm, colperm, 
+                        'G[%(i)d, %(j)d] + s * C[%(i)d, %(j)d]', 
+                        'tol[k, %(k)d]', 'X[k, %(j)d]')]
+    lines.append('    return True')
+
+    return '\n'.join(lines) + '\n'
+
+def _compile(generate, pattern, rowperm, colperm, jit):
+    pattern = tuple(sorted((int(i), int(j)) for i, j in pattern))
+    rowperm = tuple(int(i) for i in rowperm)
+    colperm = tuple(int(j) for j in colperm)
+
+    key = (generate, pattern, rowperm, colperm, jit)
+
+    if key in _solvers:
+        solver = _solvers.pop(key)
+    else:
+        namespace = {}
+        exec generate(pattern, rowperm, colperm, name='solver') in namespace
+        solver = namespace['solver']
+        if jit is not None:
+            solver = jit(solver)
+        if len(_solvers) >= max_cached_solvers:
+            _solvers.popitem(last=False)
+    _solvers[key] = solver
+
+    return solver
+
+def compile_lu_solver(pattern, rowperm, colperm, jit=None):
+    """Return a solver function generated by generate_lu_source
+
+    The max_cached_solvers most recently used solvers are cached by 
+    sparsity pattern and pivot order. If given, *jit* is applied to the
+    generated function, for example numba.njit.
+
+    """
+    return _compile(generate_lu_source, pattern, rowperm, colperm, jit)
+
+def compile_sweep_solver(pattern, rowperm, colperm, jit=None):
+    """Return a solver function generated by generate_sweep_source
+
+    The solvers are cached in the same way as by compile_lu_solver.
+
+    """
+    return _compile(generate_sweep_source, pattern, rowperm, colperm, jit)
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -15,6 +15,22 @@ import numpy as np
 from numpy import cos, sin, tan, cosh, sinh, tanh, log, exp, pi, linalg,\
      inf, ceil, floor, dot, linspace, eye, concatenate, sqrt, real, imag,\
      ones, complex, diff, delete, alltrue, maximum, size, conj
+import scipy.linalg
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu, lgmres, LinearOperator
+from copy import copy
+import lucodegen
+
+try:
+    from numba import njit
+    jit_available = True
+except ImportError:
+    ## numba is optional, without it the kernels below are plain numpy code
+    jit_available = False
+    def njit(*args, **kvargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 symbolic = False
 
@@ -26,6 +42,282 @@ def linearsolver(*args, **kvargs):
 def linearsolverError(*args, **kvargs):
     return np.linalg.LinAlgError
 
+class LUFactor(object):
+    """Sparse LU factorization of a square matrix
+
+    MNA matrices are very sparse so a SuperLU factorization is much cheaper
+    than the dense factorization done by linearsolver. The factor can be
+    used to solve for several right-hand sides.
+
+    If *reuse* is a factorization of a matrix with the same sparsity pattern
+    its fill-reducing column ordering is reused and only the numeric 
+    factorization is done. This is useful when refactoring s*C+G for 
+    several frequencies or the Jacobian at several time steps.
+
+    >>> lu = LUFactor(np.array([[2., 0.], [1., 1.]]))
+    >>> lu.solve(np.array([2., 3.]))
+    array([ 1.,  2.])
+    >>> LUFactor(np.array([[4., 0.], [2., 2.]]), reuse=lu).solve([2., 3.])
+    array([ 0.5,  1. ])
+    
+    """
+    def __init__(self, A, reuse=None):
+        A = csc_matrix(A)
+        self.shape = A.shape
+        self.dtype = np.promote_types(A.dtype, np.float32)
+        self.A = A = A.astype(self.dtype)
+
+        if not hasattr(reuse, 'colperm') or reuse.shape != self.shape:
+            reuse = None
+        self._reordered = reuse is not None
+
+        try:
+            if self._reordered:
+                self.colperm = reuse.colperm
+                self._lu = splu(A[:, self.colperm], permc_spec='NATURAL')
+            else:
+                self._lu = splu(A)
+                self.colperm = np.argsort(self._lu.perm_c)
+        except RuntimeError, e:
+            raise np.linalg.LinAlgError(str(e))
+
+    def solve(self, b):
+        b = np.asarray(b)
+        if np.iscomplexobj(b) and not np.issubdtype(self.dtype, np.complexfloating):
+            return self.solve(b.real) + 1j * self.solve(b.imag)
+
+        y = self._lu.solve(b.astype(self.dtype))
+
+        if not self._reordered:
+            return y
+
+        ## Undo the column reordering done before the factorization
+        x = np.empty_like(y)
+        x[self.colperm] = y
+        return x
+
+class DenseLUFactor(object):
+    """Dense LU factorization of a small square matrix
+
+    The SuperLU overhead is larger than the gain from the sparsity for
+    small MNA matrices so these are factored by LAPACK. The factorization
+    is done on a copy of A.
+
+    >>> lu = DenseLUFactor(np.array([[2., 0.], [1., 1.]]))
+    >>> lu.solve(np.array([2., 3.]))
+    array([ 1.,  2.])
+    
+    """
+    def __init__(self, A):
+        self.A = np.array(A)
+        self.shape = self.A.shape
+        self._lu = scipy.linalg.lu_factor(self.A)
+        if (np.diag(self._lu[0]) == 0).any():
+            raise np.linalg.LinAlgError('Singular matrix')
+
+    def solve(self, b):
+        return scipy.linalg.lu_solve(self._lu, b)
+
+class CompiledLUFactor(object):
+    """LU factorization with a solver generated for a fixed sparsity pattern
+
+    The solver eliminates the rows and columns in the pivot order of the
+    sparse factorization *template* and only touches its non-zero entries,
+    see the lucodegen module. Matrices with entries outside the pattern of 
+    the template, with too small pivots or solutions with a componentwise
+    backward error above backward_rtol are factored by LUFactor instead.
+
+    """
+    pivot_rtol = 1e-3
+    backward_rtol = 1e-10
+    
+    def __init__(self, template):
+        self.template = template
+        self.shape = template.shape
+        self.colperm = template.colperm
+        self.A = None
+
+        rowperm = np.argsort(template._lu.perm_r)
+        colperm = np.argsort(template._lu.perm_c)
+        if template._reordered:
+            colperm = template.colperm[colperm]
+        self._colperm = colperm
+
+        rows, cols = template.A.nonzero()
+        self._outside = np.ones(self.shape, dtype=bool)
+        self._outside[rows, cols] = False
+
+        self._solver = lucodegen.compile_lu_solver(zip(rows, cols), 
+                                                   rowperm, colperm, jit=njit)
+
+    def refactor(self, A):
+        A = np.array(A)
+        if A.dtype != np.float64 or A[self._outside].any():
+            return LUFactor(A, reuse=self.template)
+        new = copy(self)
+        new.A = A
+        return new
+
+    def solve(self, b):
+        b = np.asarray(b)
+        if b.dtype == np.float64 and b.shape == self.shape[:1]:
+            tol = self.pivot_rtol * abs(self.A).max(axis=0)[self._colperm]
+            x = np.empty(len(b))
+            if self._solver(self.A, b, tol, x) and self._accurate(x, b):
+                return x
+        return LUFactor(self.A, reuse=self.template).solve(b)
+
+    def _accurate(self, x, b):
+        ## The pivots are not chosen for the current matrix so the residual
+        ## is checked against the rounding errors of A x - b
+        r = abs(np.dot(self.A, x) - b)
+        return (r <= self.backward_rtol * 
+                (np.dot(abs(self.A), abs(x)) + abs(b))).all()
+
+## Generated solvers are only used if enabled and numba is available. The
+## compilation takes about a second per sparsity pattern and they have not
+## been found faster than LAPACK for typical circuits.
+codegen_solvers = False
+
+## Largest system for which compile_lu_factor generates a specialized solver
+codegen_max_size = 20
+
+def compile_lu_factor(lu):
+    """Return a factorization that refactors matrices with the pattern of lu 
+    using generated code
+
+    lu is returned unchanged unless codegen_solvers is set and numba is 
+    available.
+    """
+    if not (codegen_solvers and jit_available) or \
+            lu.shape[0] > codegen_max_size:
+        return lu
+    try:
+        if isinstance(lu, DenseLUFactor):
+            ## The pivot order is taken from a sparse factorization
+            return CompiledLUFactor(LUFactor(lu.A))
+        return CompiledLUFactor(lu)
+    except (ValueError, np.linalg.LinAlgError):
+        return lu
+
+## Smallest system that lu_factor factors with sparse LU, smaller systems 
+## are solved faster by the dense LAPACK solver
+sparse_lu_min_size = 100
+
+def lu_factor(A, reuse=None):
+    if isinstance(reuse, CompiledLUFactor) and reuse.shape == np.shape(A):
+        return reuse.refactor(A)
+    if np.shape(A)[0] < sparse_lu_min_size:
+        return DenseLUFactor(A)
+    return LUFactor(A, reuse=reuse)
+
+## Smallest system for which the transient analysis solves the Newton 
+## iterations with krylov_solve instead of factoring the Jacobian
+krylov_min_size = 500
+
+def krylov_solve(A, b, precond, tol=1e-5):
+    """Solve A x = b with LGMRES preconditioned by the factorization precond
+
+    Only products of the sparse A and vectors are calculated. The iterations
+    stop when the residual norm is below tol times the norm of b. If they 
+    do not converge A is factored by LUFactor reusing the column ordering 
+    of precond.
+    """
+    A = csc_matrix(A)
+    M = LinearOperator(A.shape, matvec=precond.solve, dtype=A.dtype)
+    x, info = lgmres(A, b, M=M, tol=tol, atol=0)
+    if info != 0:
+        return LUFactor(A, reuse=precond).solve(b)
+    return x
+
+## Largest system that frequency sweeps solve with one batched dense solve,
+## larger systems are solved frequency by frequency with sparse LU
+batch_solve_max_size = 100
+
+def linearsolver_batch(A, b):
+    """Solve the stack of linear systems A[k] x[k] = b
+
+    A has the shape (m, n, n) and b is either one right-hand side of
+    length n or a stack of right-hand sides with the shape (m, n).
+    All systems are passed to LAPACK in a single call.
+    """
+    b = np.broadcast_to(b, A.shape[:-1])
+    return np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+
+## Largest number of matrix elements in the stack of one linearsolver_batch
+## call made by linearsolver_sweep
+batch_solve_max_elements = 2**20
+
+def linearsolver_sweep(G, C, ss, b):
+    """Solve (s*C + G) x = b for every s in ss
+
+    Returns an array with the shape (len(ss), n). The systems are solved by
+    linearsolver_batch with the frequencies split in chunks so that a stack
+    of matrices has at most batch_solve_max_elements elements. If 
+    codegen_solvers is set and numba is available small systems are 
+    instead solved by a kernel generated for the sparsity pattern of G and 
+    C that loops over all frequencies in machine code.
+    """
+    ss = np.asarray(ss)
+    if codegen_solvers and jit_available and len(b) <= codegen_max_size:
+        X = _linearsolver_sweep_codegen(G, C, ss, b)
+        if X is not None:
+            return X
+
+    X = np.empty((len(ss), len(b)), dtype=np.result_type(G, C, ss, b))
+    nchunk = max(1, batch_solve_max_elements // np.size(G))
+    for k in range(0, len(ss), nchunk):
+        sschunk = ss[k:k + nchunk]
+        X[k:k + nchunk] = linearsolver_batch(
+            sschunk[:, np.newaxis, np.newaxis] * C + G, b)
+    return X
+
+def _linearsolver_sweep_codegen(G, C, ss, b):
+    """Solve a sweep with a generated solver, returns None if it fails"""
+    if len(ss) == 0:
+        return None
+
+    ## The pivot order is taken from a sparse factorization at the middle
+    ## of the sweep
+    try:
+        template = LUFactor(ss[len(ss) // 2] * C + G)
+    except np.linalg.LinAlgError:
+        return None
+    rowperm = np.argsort(template._lu.perm_r)
+    colperm = np.argsort(template._lu.perm_c)
+    
+    rows, cols = np.nonzero((G != 0) | (C != 0))
+    try:
+        solver = lucodegen.compile_sweep_solver(zip(rows, cols), 
+                                                rowperm, colperm, jit=njit)
+    except ValueError:
+        return None
+
+    ## Upper bounds of the column magnitudes of s*C + G
+    colmax = abs(G).max(axis=0) + abs(ss)[:, np.newaxis] * abs(C).max(axis=0)
+    tol = CompiledLUFactor.pivot_rtol * colmax[:, colperm]
+
+    X = np.empty((len(ss), len(b)), dtype=np.result_type(G, C, ss, b))
+    if solver(G, C, ss, b, tol, X):
+        return X
+
+@njit(cache=True)
+def insert_refnode_into(x, irefnode, xfull):
+    """Copy x into xfull leaving the reference node element untouched"""
+    xfull[:irefnode] = x[:irefnode]
+    xfull[irefnode+1:] = x[irefnode:]
+
+@njit(cache=True)
+def remove_refnode_into(f, J, irefnode, fred, Jred):
+    """Copy f and J without the reference node row and column to fred, Jred"""
+    k = irefnode
+    fred[:k] = f[:k]
+    fred[k:] = f[k+1:]
+    Jred[:k, :k] = J[:k, :k]
+    Jred[:k, k:] = J[:k, k+1:]
+    Jred[k:, :k] = J[k+1:, :k]
+    Jred[k:, k:] = J[k+1:, k+1:]
+
 def toMatrix(array): 
     return array.astype('complex')
 
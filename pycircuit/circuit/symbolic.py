@@ -37,6 +37,25 @@ def linearsolver(A, b):
 def linearsolverError(*args, **kvargs):
     return np.linalg.LinAlgError
 
+class LUFactor(object):
+    """Symbolic counterpart of numeric.LUFactor
+
+    There is no factorization to reuse so each solve is done by linearsolver
+    """
+    def __init__(self, A, reuse=None):
+        self.A = A
+
+    def solve(self, b):
+        if len(np.shape(b)) == 2:
+            return np.array([linearsolver(self.A, col) for col in b.T]).T
+        return linearsolver(self.A, b)
+
+def lu_factor(A, reuse=None):
+    return LUFactor(A, reuse=reuse)
+
+def compile_lu_factor(lu):
+    return lu
+
 def toMatrix(a):
     return sympy.Matrix(a.tolist())
 
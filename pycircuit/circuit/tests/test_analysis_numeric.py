@@ -6,9 +6,12 @@ from nose.tools import *
 import pycircuit.circuit.circuit 
 from pycircuit.circuit import *
 import numpy as np
-from numpy.testing import assert_array_almost_equal, assert_array_equal
+from numpy.testing import assert_array_almost_equal
 from test_circuit import create_current_divider
-import unittest
+
+def setup_module():
+    ## Symbolic tests may leave a symbolic temperature in defaultepar
+    defaultepar.T = 300
 
 def test_integer_component_values():
     """Test dc analysis with integer component values
@@ -30,12 +33,118 @@ def test_integer_component_values():
 
     assert_equal(res.i('R2.plus'), 0.09)
 
+def test_lu_factor_size():
+    """Test that only large matrices are factored with sparse LU"""
+    small = np.eye(numeric.sparse_lu_min_size - 1)
+    large = np.eye(numeric.sparse_lu_min_size)
+    assert isinstance(numeric.lu_factor(small), numeric.DenseLUFactor)
+    assert isinstance(numeric.lu_factor(large), numeric.LUFactor)
+
+    b = np.arange(1., len(small) + 1)
+    assert_array_almost_equal(numeric.lu_factor(2 * small).solve(b), b / 2)
+
+    ## The factorization does not change when the matrix is modified
+    A = 2 * small
+    lu = numeric.lu_factor(A)
+    A[:] = 0
+    assert_array_almost_equal(lu.solve(b), b / 2)
+
+def create_rc_lowpass():
+    """Return an RC low-pass filter driven by an AC voltage source"""
+    c = SubCircuit(toolkit=numeric)
+
+    n1,n2 = c.add_nodes('net1', 'net2')
+
+    c['vs'] = VS(n1, gnd, vac = 1.)
+    c['R1'] = R( n1,  n2, r = 1e3)
+    c['C'] = C( n2, gnd, c = 1e-9)
+
+    return c
+
+def test_ac_frequency_sweep():
+    """Test that a frequency sweep gives the same result as single frequencies
+    """
+    pycircuit.circuit.circuit.default_toolkit = numeric
+    c = create_rc_lowpass()
+
+    freqs = np.array([1e3, 1e5, 1e7])
+    res = AC(c).solve(freqs)
+
+    for k, f in enumerate(freqs):
+        res_f = AC(c).solve(f)
+        assert_array_almost_equal(res.x[:, k], res_f.x)
+        assert_array_almost_equal(res.xdot[:, k], res_f.xdot)
+
+def test_sweep_solve_chunks():
+    """Test that a batched sweep split in chunks solves all frequencies"""
+    G = np.array([[1e-3, -1e-3], [-1e-3, 2e-3]])
+    C = np.array([[0., 0.], [0., 1e-9]])
+    b = np.array([1., 0.])
+    ss = 2j * np.pi * np.logspace(3, 7, 5)
+
+    batch_solve_max_elements = numeric.batch_solve_max_elements
+    numeric.batch_solve_max_elements = 2 * G.size
+    try:
+        X = numeric.linearsolver_sweep(G, C, ss, b)
+    finally:
+        numeric.batch_solve_max_elements = batch_solve_max_elements
+
+    for k, s in enumerate(ss):
+        assert_array_almost_equal(X[k], np.linalg.solve(s * C + G, b))
+
+def test_ac_low_precision():
+    """Test that single precision AC agrees with double precision AC
+    """
+    pycircuit.circuit.circuit.default_toolkit = numeric
+    c = create_rc_lowpass()
+
+    freqs = np.array([1e3, 1e5, 1e7])
+    res = AC(c).solve(freqs)
+    res_low = AC(c).solve(freqs, low_precision=True)
+
+    assert_equal(res_low.x.dtype, res.x.dtype)
+    assert_array_almost_equal(res_low.v('net2').y, res.v('net2').y, 
+                              decimal=5)
+
+def test_transimpedance_integer_node_names():
+    """Test transimpedance analysis of a circuit with integer node names
+    """
+    pycircuit.circuit.circuit.default_toolkit = numeric
+    c = SubCircuit(toolkit=numeric)
+
+    c['R1'] = R(1, 2, r = 1e3)
+    c['R2'] = R(2, gnd, r = 1e3)
+
+    zm, = TransimpedanceAnalysis(c).solve(0, [Branch(2, gnd)])
+
+    ## All current injected in 1 and 2 flows through R2
+    assert_array_almost_equal(zm, 1e3 * np.ones(2))
+
+    assert_raises(ValueError, TransimpedanceAnalysis(c).solve, 0, 
+                  [Branch(3, gnd)])
+
+def test_transimpedance_current_output():
+    """Test current gain output of the transimpedance analysis
+    """
+    pycircuit.circuit.circuit.default_toolkit = numeric
+    c = SubCircuit(toolkit=numeric)
+
+    n1,n2 = c.add_nodes('net1', 'net2')
+
+    c['R1'] = R( n1,  n2, r = 1e3)
+    c['vs'] = VS(n2, gnd, v = 0.)
+
+    branch = c.get_terminal_branch('vs.plus')[0]
+    zm, = TransimpedanceAnalysis(c).solve(0, [branch], currentoutput=True)
+
+    ## All current injected in net1 and net2 flows through the source
+    assert_array_almost_equal(abs(zm[:2]), np.ones(2))
+
 def TODOtest_noise_dc_steady_state():
     """Test that dc-steady state is accounted for in noise simulations
     """
     pass
 
-@unittest.skip("Skip failing test")
 def test_noise_with_frequency_vector():
     """Test that noise analysis support an array as input argument for frequency
 
@@ -52,5 +161,5 @@ def test_noise_with_frequency_vector():
     noise = Noise(c, inputsrc='vs', outputnodes=(n2, gnd))
     should = np.array([noise.solve(0)['Svnout'],noise.solve(1)['Svnout']])
     res = noise.solve(np.array([0,1]))
-    assert_array_equal(res['Svnout'], should)
+    assert_array_almost_equal(res['Svnout'] / should, np.ones(2))
 
@@ -4,7 +4,8 @@
 """Circuit element tests
 """
 
-from pycircuit.circuit.elements import VSin, ISin, IS, R, L, C, SubCircuit, gnd
+from pycircuit.circuit.elements import VSin, ISin, IS, R, L, C, Diode, \
+    SubCircuit, gnd
 from pycircuit.circuit.transient import Transient
 from pycircuit.circuit import circuit #new
 from math import floor
@@ -117,6 +118,55 @@ def test_transient_nonlinear_C():
     assert  abs(res_imp.v(2,gnd)[-1] - expected) < 1e-2*expected,\
         'Does not match QUCS result:'
 
+def test_transient_linear():
+    """Test that the linear circuit solution agrees with Newton iterations
+    """
+    circuit.default_toolkit = circuit.numeric
+    c = SubCircuit()
+    c['VSin'] = VSin(gnd, 1, va=10, freq=50e3)
+    c['R1'] = R(1, 2, r=1e6)
+    c['C'] = C(2, gnd, c=1e-12)
+    c['L'] = L(2, gnd, L=1e-3)
+
+    tran = Transient(c)
+    assert tran._is_linear(np.zeros(c.n))
+    res = tran.solve(tend=40e-6, timestep=1e-6)
+
+    tran_newton = Transient(c)
+    tran_newton._is_linear = lambda x: False
+    res_newton = tran_newton.solve(tend=40e-6, timestep=1e-6)
+
+    assert np.allclose(res.x, res_newton.x, rtol=1e-6, atol=1e-9)
+
+    c = SubCircuit()
+    c['R1'] = R(1, gnd, r=1e6)
+    c['C'] = myC(1, gnd)
+    assert not Transient(c)._is_linear(np.zeros(c.n))
+
+def test_transient_krylov():
+    """Test that Newton-Krylov iterations agree with factored Newton iterations
+    """
+    circuit.default_toolkit = circuit.numeric
+    c = SubCircuit()
+    c['ISin'] = ISin(gnd, 1, ia=1e-3, freq=50e3)
+    c['R1'] = R(1, gnd, r=1e3)
+    c['C'] = C(1, gnd, c=1e-9)
+    c['D'] = Diode(1, gnd)
+
+    ## The diode is evaluated with the default environment parameters which
+    ## may have a symbolic temperature after the symbolic tests
+    T, krylov_min_size = defaultepar.T, circuit.numeric.krylov_min_size
+    defaultepar.T = 300
+    try:
+        res = Transient(c).solve(tend=40e-6, timestep=1e-6)
+
+        circuit.numeric.krylov_min_size = 1
+        res_krylov = Transient(c).solve(tend=40e-6, timestep=1e-6)
+    finally:
+        defaultepar.T, circuit.numeric.krylov_min_size = T, krylov_min_size
+
+    assert np.allclose(res.x, res_krylov.x, rtol=1e-3, atol=1e-6)
+
 def test_transient_get_diff():
     """Test of differentiation method
     """
@@ -0,0 +1,70 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2008 Pycircuit Development Team
+# See LICENSE for details.
+
+"""Tests of generated LU solvers
+"""
+
+from pycircuit.circuit import *
+from pycircuit.circuit.analysis import remove_row_col
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+def test_compiled_lu_factor():
+    """Test that the generated solver agrees with a dense solve"""
+    c = SubCircuit(toolkit=numeric)
+    n1, n2 = c.add_nodes('net1', 'net2')
+    c['vs'] = VS(n1, gnd, v=1.)
+    c['R1'] = R(n1, n2, r=1e3)
+    c['R2'] = R(n2, gnd, r=2e3)
+    c['C'] = C(n2, gnd, c=1e-9)
+
+    x = np.zeros(c.n)
+    J, = remove_row_col((c.G(x) + c.C(x) / 1e-6,), c.get_node_index(gnd),
+                        numeric)
+    b = np.arange(1., len(J) + 1)
+
+    lu = numeric.CompiledLUFactor(numeric.LUFactor(J))
+
+    for scale in 1., 2.:
+        assert_array_almost_equal(numeric.lu_factor(scale * J, reuse=lu).solve(b),
+                                  np.linalg.solve(scale * J, b))
+
+def test_compile_lu_factor_disabled():
+    """Test that the factorization is unchanged without codegen_solvers"""
+    lu = numeric.LUFactor(np.array([[2., 0.], [1., 1.]]))
+    codegen_solvers = numeric.codegen_solvers
+    numeric.codegen_solvers = False
+    try:
+        assert numeric.compile_lu_factor(lu) is lu
+    finally:
+        numeric.codegen_solvers = codegen_solvers
+
+def test_compiled_lu_factor_pattern_change():
+    """Test that entries outside the pattern fall back to sparse LU"""
+    J = np.array([[2., 0.], [1., 1.]])
+    lu = numeric.CompiledLUFactor(numeric.LUFactor(J))
+
+    J2 = np.array([[2., 1.], [1., 1.]])
+    b = np.array([1., 2.])
+    assert_array_almost_equal(numeric.lu_factor(J2, reuse=lu).solve(b),
+                              np.linalg.solve(J2, b))
+
+def test_sweep_solver():
+    """Test that the generated sweep solver agrees with a batched solve"""
+    c = SubCircuit(toolkit=numeric)
+    n1, n2 = c.add_nodes('net1', 'net2')
+    c['vs'] = VS(n1, gnd, vac=1.)
+    c['R1'] = R(n1, n2, r=1e3)
+    c['L'] = L(n2, gnd, L=1e-3)
+    c['C'] = C(n2, gnd, c=1e-9)
+
+    x = np.zeros(c.n)
+    G, C_, u = remove_row_col((c.G(x), c.C(x), c.u(analysis='ac')), 
+                              c.get_node_index(gnd), numeric)
+    ss = 2j * np.pi * np.array([1e3, 1e5, 1e7])
+
+    X = numeric._linearsolver_sweep_codegen(G, C_, ss, -u)
+    assert X is not None
+    assert_array_almost_equal(X, numeric.linearsolver_batch(
+            ss[:, np.newaxis, np.newaxis] * C_ + G, -u))
@@ -95,41 +95,163 @@ class Transient(Analysis):
         
         self._dt = None
         self._diff_error = None #used for saving difference between euler and trapezoidal
+        self._lu = None #last LU factorization of the Jacobian
+        self._precond = None #preconditioner of the Krylov iterations
+        self._precond_niter = None #Newton iterations when _precond was made
+        self._linear = None #(G, C) if the circuit is linear
+        self._linear_lu = {} #LU factorizations of G + Geq of a linear circuit
     
     ## This is borrowed from dcanalysis.py, would like to 
     ## import it from there instead.
     ## But it's an object method requiring a DC as self
     ## so using DC._newton doesn't work
     def _newton(self, func, x0): 
-        ones_nodes = self.toolkit.ones(len(self.cir.nodes))
-        ones_branches = self.toolkit.ones(len(self.cir.branches))
-        
-        abstol = self.toolkit.concatenate((self.par.iabstol * ones_nodes,
-                                 self.par.vabstol * ones_branches))
-        xtol = self.toolkit.concatenate((self.par.vabstol * ones_nodes,
-                                 self.par.iabstol * ones_branches))
-        
-        (x0, abstol, xtol) = remove_row_col((x0, abstol, xtol), self.irefnode, self.toolkit)
-        
-        try:
-            result = fsolve(refnode_removed(func, self.irefnode, self.toolkit), 
-                            x0, 
-                            full_output = True, 
-                            reltol = self.par.reltol,
-                            abstol = abstol, xtol=xtol,
-                            maxiter = self.par.maxiter,
-                            toolkit = self.toolkit)
-        except self.toolkit.linalg.LinAlgError, e:
-            raise SingularMatrix(e.message)
+        (x0,) = remove_row_col((x0,), self.irefnode, self.toolkit)
+        abstol, xtol = self._tolerances
+
+        ## The Newton iterations of large systems are solved with Krylov
+        ## iterations preconditioned by an earlier factorization instead of
+        ## factoring the Jacobian
+        precond = None
+        if self._precond is not None and not self.toolkit.symbolic and \
+                len(x0) >= self.toolkit.krylov_min_size:
+            precond = self._precond
+
+        def solve(precond):
+            try:
+                return fsolve(self._refnode_removed(func), 
+                              x0, 
+                              full_output = True, 
+                              reltol = self.par.reltol,
+                              abstol = abstol, xtol=xtol,
+                              maxiter = self.par.maxiter,
+                              toolkit = self.toolkit,
+                              lureuse = self._lu,
+                              precond = precond)
+            except self.toolkit.linalg.LinAlgError, e:
+                raise SingularMatrix(e.message)
         
-        x, infodict, ier, mesg = result
+        x, infodict, ier, mesg = solve(precond)
+
+        if precond is not None:
+            if ier != 1:
+                ## Factor the Jacobian if the preconditioned iterations fail
+                precond = None
+                x, infodict, ier, mesg = solve(None)
+            elif infodict['niter'] > self._precond_niter + 1:
+                ## The Jacobian has drifted away from the preconditioner, 
+                ## it is factored again in the next time step
+                self._precond = None
+
+        ## The last factorization of the Jacobian is the preconditioner of
+        ## later steps
+        if precond is None:
+            self._precond = infodict['lu']
+            self._precond_niter = infodict['niter']
+
+        ## The Jacobian keeps its sparsity pattern between time steps so the
+        ## first factorization is reused, the numeric toolkit can do the
+        ## refactorizations with code generated for the pattern
+        if self._lu is None:
+            self._lu = self.toolkit.compile_lu_factor(infodict['lu'])
         
         if ier != 1:
             raise NoConvergenceError(mesg)
         
-        # Insert reference node voltage
-        return self.toolkit.concatenate((x[:self.irefnode], self.toolkit.array([0.0]), x[self.irefnode:]))
+        return self._insert_refnode(x)
     
+    def _linear_step(self, x0, t):
+        """Solve a time step of a linear circuit
+
+        The Jacobian G + Geq of a linear circuit does not depend on x so it
+        is factored once for each time step length and a single Newton step
+        from x0 gives the solution.
+        """
+        G, C = self._linear
+
+        ## Geq of the first step is always calculated with backward euler
+        key = (self._dt, self._iqlast is None)
+        iqlast = self._iqlast
+
+        iq, Geq = self.get_diff(self.cir.q(x0), C)
+        f = self.cir.i(x0) + iq + self.cir.u(t, analysis=self.par.analysis)
+
+        if key not in self._linear_lu:
+            (J,) = remove_row_col((G + Geq,), self.irefnode, self.toolkit)
+            try:
+                self._linear_lu[key] = self.toolkit.lu_factor(J)
+            except self.toolkit.linalg.LinAlgError, e:
+                raise SingularMatrix(e.message)
+
+        (x0, f) = remove_row_col((x0, f), self.irefnode, self.toolkit)
+        x = x0 + self._linear_lu[key].solve(-f)
+
+        x = self._insert_refnode(x)
+
+        ## Update the derivative of the charges to the solution as the last
+        ## Newton iteration would have done
+        self._iqlast = iqlast
+        self.get_diff(self.cir.q(x), C)
+
+        return x
+
+    def _is_linear(self, x):
+        """Return True if G and C of the circuit are independent of x
+
+        The linear attribute is not reliable for user defined elements so 
+        the matrices are also compared at x and at a perturbed x-vector. The
+        perturbation is different for every node so branch voltages change 
+        as well.
+        """
+        if self.toolkit.symbolic:
+            return False
+
+        if isinstance(self.cir, SubCircuit):
+            elements = self.cir.xflatelements
+        else:
+            elements = [self.cir]
+        if not all(element.linear for element in elements):
+            return False
+
+        x1 = x + self.toolkit.linspace(0.1, 1., len(x))
+        return self.toolkit.alltrue(self.cir.G(x) == self.cir.G(x1)) and \
+            self.toolkit.alltrue(self.cir.C(x) == self.cir.C(x1))
+
+    def _insert_refnode(self, x):
+        """Return x with the reference node voltage inserted
+
+        With the numeric toolkit x is copied to a vector allocated once by 
+        solve(). The vector is overwritten in the next time step so it must
+        be copied if it is kept.
+        """
+        tk = self.toolkit
+        if tk.symbolic:
+            return tk.concatenate((x[:self.irefnode], tk.array([0.0]), 
+                                   x[self.irefnode:]))
+
+        tk.insert_refnode_into(x, self.irefnode, self._xfull)
+        return self._xfull
+
+    def _refnode_removed(self, func):
+        """Wrap func to take and return vectors with the reference node removed
+
+        With the numeric toolkit the full x-vector and the reduced f and J 
+        are written to buffers allocated once by solve() instead of allocating
+        new arrays in every Newton iteration.
+        """
+        tk = self.toolkit
+        if tk.symbolic:
+            return refnode_removed(func, self.irefnode, tk)
+
+        xfull, fred, Jred = self._buffers
+
+        def new(x):
+            tk.insert_refnode_into(x, self.irefnode, xfull)
+            f, J = func(xfull)
+            tk.remove_refnode_into(f, J, self.irefnode, fred, Jred)
+            return fred, Jred
+        return new
+
     def get_timestep(self,endtime,dtmin=1e-12):
         """Method to provide the next timestep for transient simulation.
         
@@ -154,7 +276,7 @@ class Transient(Analysis):
             yield t,dt
             de=self._diff_error
             iq=self._iq
-            if (de != None) and (iq != None):
+            if (de is not None) and (iq is not None):
                 #iq_error=self.toolkit.dot(de,de)/self.toolkit.dot(iq,iq)-iq_tolerance
                 #print iq_error
                 dt = max(dt, dtmin)
@@ -175,7 +297,7 @@ class Transient(Analysis):
         dt=self._dt
         a,b,b_=self._method[self.par.method] 
         resultEuler = (q-self._qlast[0])/dt
-        if self._iqlast == None: #first step always requires backward euler
+        if self._iqlast is None: #first step always requires backward euler
             geq=C/dt
             n=self.cir.n
             self._iqlast=self.toolkit.zeros((len(b),n)) #initialize history vectors at first step
@@ -210,14 +332,17 @@ class Transient(Analysis):
             J = self.cir.G(x) + Geq #return C somehow?
             return self.toolkit.array(f, dtype=float), self.toolkit.array(J, dtype=float)
         
-        x=self._newton(func,x0)
+        if self._linear is not None:
+            x = self._linear_step(x0, t)
+        else:
+            x = self._newton(func, x0)
         #history update
         self._iqlast = self.toolkit.concatenate((self.toolkit.array([self._iq]),self._iqlast))[:-1]
         self._qlast = self.toolkit.concatenate((self.toolkit.array([self.cir.q(x)]),self._qlast))[:-1]
         
         # Insert reference node voltage
         #x = self.toolkit.concatenate((x[:irefnode], self.toolkit.array([0.0]), x[irefnode:]))
-        if provided_function != None:
+        if provided_function is not None:
             result=x,provided_function(f,J,C)
         else:
             result=x,None
@@ -227,34 +352,63 @@ class Transient(Analysis):
     def solve(self, refnode=gnd, tend=1e-3, x0=None, timestep=1e-6, provided_function=None):
         #provided_function is a function that is sent to solve_timestep for evaluation
         
-        X = [] # will contain a list of all x-vectors
         self.irefnode=self.cir.get_node_index(refnode)
         n = self.cir.n
+        self._lu = None
+        self._precond = None
+        self._buffers = (self.toolkit.zeros(n), self.toolkit.zeros(n-1),
+                         self.toolkit.zeros((n-1, n-1)))
+        self._xfull = self.toolkit.zeros(n) #solution of the last time step
+
+        ## The Newton tolerances are the same in all time steps
+        ones_nodes = self.toolkit.ones(len(self.cir.nodes))
+        ones_branches = self.toolkit.ones(len(self.cir.branches))
+        abstol = self.toolkit.concatenate((self.par.iabstol * ones_nodes,
+                                 self.par.vabstol * ones_branches))
+        xtol = self.toolkit.concatenate((self.par.vabstol * ones_nodes,
+                                 self.par.iabstol * ones_branches))
+        self._tolerances = remove_row_col((abstol, xtol), self.irefnode, 
+                                          self.toolkit)
         self._dt = timestep
         if x0 is None:
             x = self.toolkit.zeros(n)
         else:
             x = x0 
         
+        ## Linear circuits are solved with one Newton step per time step
+        self._linear_lu = {}
+        if self._is_linear(x):
+            self._linear = (self.cir.G(x), self.cir.C(x))
+        else:
+            self._linear = None
+
         a,b,b_=self._method[self.par.method] 
         self._qlast=self.toolkit.zeros((len(a),n))#initialize q-history vector
         #shift in q(x0) to q-history
         self._qlast = self.toolkit.concatenate((self.toolkit.array([self.cir.q(x)]),self._qlast))[:-1]
-        #is this still needed
-        order=1 #number of past x-values needed
-        for i in xrange(order):
-            X.append(copy(x))
         
         times = self.get_timestep(tend)
-        timelist=[] #for plotting purposes
+
+        ## Preallocate the x-vectors and times of the expected number of
+        ## time steps, the arrays are doubled in size if more are needed
+        nalloc = int(self.toolkit.ceil(tend / timestep)) + 1
+        X = self.toolkit.zeros((nalloc, n))
+        timelist = self.toolkit.zeros(nalloc) #for plotting purposes
+        nsteps = 0
+
         self._iqlast=None #forces first step to be Backward Euler
         for t,dt in times:
-            timelist.append(t)
+            if nsteps == len(timelist):
+                X = self.toolkit.concatenate((X, self.toolkit.zeros(X.shape)))
+                timelist = self.toolkit.concatenate((timelist, 
+                                                     self.toolkit.zeros(nsteps)))
             self._dt=dt
-            x,feval=self.solve_timestep(X[-1], t, provided_function=provided_function)
-            X.append(copy(x))
-        X = self.toolkit.array(X[1:]).T
-        timelist = self.toolkit.array(timelist)
+            x,feval=self.solve_timestep(x, t, provided_function=provided_function)
+            X[nsteps] = x
+            timelist[nsteps] = t
+            nsteps += 1
+        X = X[:nsteps].T
+        timelist = timelist[:nsteps]
         
         #print("steps: "+str( len(timelist)))
         